@@ -1,3 +1,11 @@
-from .agent import root_agent
-
 __all__ = ["root_agent"]
+
+
+def __getattr__(name: str):
+    # Importing .agent pulls in google.adk and creates the manager workspace,
+    # so only do it once root_agent is actually requested; code that only
+    # needs workspace_utils stays light.
+    if name == "root_agent":
+        from .agent import root_agent
+        return root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,40 +1,91 @@
 import asyncio
 import atexit
-import uuid
+import contextvars
+import io
+import operator
+import os
+from collections.abc import Awaitable, Callable
 
 from google.adk.agents import Agent
 from google.adk.runners import Runner
 from google.adk.sessions import BaseSessionService
-from google.adk.tools import ToolContext
+from google.adk.tools import FunctionTool, ToolContext
 from google.genai import types
 
 from manager_agent.workspace_utils import Workspace
 
-workspace = Workspace.create()
-atexit.register(workspace.delete)
+# Upper bound on sub-agents running at once within one spawn_sub_agents call.
+# Clamped to 1 so a zero or negative setting can't hang every spawn.
+SUBAGENT_MAX_CONCURRENCY = max(
+    1, int(os.getenv("SUBAGENT_MAX_CONCURRENCY", "8")))
 
+# The manager's own workspace, created on first use rather than at import.
+_workspace: Workspace | None = None
+_workspace_lock = asyncio.Lock()
 
-def _make_sub_execute_command(ws: Workspace):
-    """Create an execute_command tool function bound to a specific workspace."""
-    def execute_command(command: str) -> dict:
-        """Execute a shell command in this agent's workspace.
 
-        Args:
-            command: The shell command to run (e.g. "ls -la", "python script.py").
+async def _get_workspace() -> Workspace:
+    """Return the manager workspace, creating it on first use."""
+    global _workspace
+    if _workspace is None:
+        async with _workspace_lock:
+            if _workspace is None:
+                _workspace = await Workspace.acreate()
+                atexit.register(_workspace.delete)
+    return _workspace
 
-        Returns:
-            A dictionary containing the command execution result.
-        """
-        return ws.exec(command)
-    return execute_command
+
+# Workspace of the sub-agent running in the current task. Set around each
+# run so one tool object can be shared by every sub-agent.
+_CURRENT_WS: contextvars.ContextVar[Workspace] = contextvars.ContextVar(
+    "_CURRENT_WS")
+
+
+class _ExecTool:
+    """Execute a shell command in this agent's workspace.
+
+    Args:
+        command: The shell command to run (e.g. "ls -la", "python script.py").
+
+    Returns:
+        A dictionary containing the command execution result.
+    """
+
+    __slots__ = ()
+    # ADK names the tool after the callable's __name__.
+    __name__ = "execute_command"
+
+    async def __call__(self, command: str) -> dict:
+        # Async so a long-running command doesn't block sibling sub-agents.
+        return await _CURRENT_WS.get().aexec(command)
+
+
+class _CachedFunctionTool(FunctionTool):
+    """FunctionTool that derives its declaration once, not on every LLM call.
+
+    ADK wraps plain callables in a fresh FunctionTool and re-runs signature
+    and docstring introspection for each model request; the declaration of a
+    fixed tool never changes, so build it once and reuse it.
+    """
+
+    _declaration: types.FunctionDeclaration | None = None
+
+    def _get_declaration(self) -> types.FunctionDeclaration | None:
+        if self._declaration is None:
+            self._declaration = super()._get_declaration()
+        return self._declaration
+
+
+# Shared by every sub-agent so the tool object (and the schema ADK derives
+# from it) is built once per process.
+_sub_execute_command = _CachedFunctionTool(_ExecTool())
 
 
 def _create_sub_agent(
-    ws: Workspace,
     session_service: BaseSessionService,
     app_name: str,
     agent_name: str,
-) -> tuple[Runner, str]:
+) -> Runner:
     """Create a sub-agent that shares the root agent's session service and app_name."""
     agent = Agent(
         model="gemini-3-flash-preview",
@@ -45,16 +96,14 @@ def _create_sub_agent(
             "You have access to the 'execute_command' tool to run shell "
             "commands in your workspace."
         ),
-        tools=[_make_sub_execute_command(ws)],
+        tools=[_sub_execute_command],
     )
 
-    runner = Runner(
+    return Runner(
         app_name=app_name,
         agent=agent,
         session_service=session_service,
     )
-    session_id = f"session_{agent_name}_{uuid.uuid4().hex[:8]}"
-    return runner, session_id
 
 
 async def _run_sub_agent(
@@ -64,36 +113,95 @@ async def _run_sub_agent(
     app_name: str,
     user_id: str,
     agent_name: str,
+    session_id: str,
 ) -> str:
-    """Run a single sub-agent to completion and return its final response."""
-    runner, session_id = _create_sub_agent(
-        ws, session_service, app_name, agent_name
-    )
+    """Run a single sub-agent to completion and return its final response.
 
-    session = await session_service.create_session(
-        app_name=app_name,
-        user_id=user_id,
-        session_id=session_id,
-    )
+    The session ``session_id`` must already exist in ``session_service``.
+    """
+    runner = _create_sub_agent(session_service, app_name, agent_name)
+    token = _CURRENT_WS.set(ws)
+    try:
+        buf = io.StringIO()
+        write = buf.write
+        get_partial_content = operator.attrgetter("partial", "content")
+        async for event in runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=types.UserContent(
+                parts=[types.Part(text=task_prompt)]
+            ),
+        ):
+            partial, content = get_partial_content(event)
+            if partial or not content:
+                continue
+            parts = content.parts
+            if not parts:
+                continue
+            for part in parts:
+                t = part.text
+                if t:
+                    if buf.tell():
+                        write("\n")
+                    write(t)
+    finally:
+        _CURRENT_WS.reset(token)
 
-    response_parts: list[str] = []
-    async for event in runner.run_async(
-        user_id=user_id,
-        session_id=session.id,
-        new_message=types.UserContent(
-            parts=[types.Part(text=task_prompt)]
-        ),
-    ):
-        if not event.partial and event.content and event.content.parts:
-            for part in event.content.parts:
-                if part.text:
-                    response_parts.append(part.text)
+    return buf.getvalue() or "(no response)"
+
+
+async def _create_sub_agent_sessions(
+    task_prompts: list[dict], tool_context: ToolContext
+) -> list[str]:
+    """Create one session per task up front and return their session ids.
 
-    return "\n".join(response_parts) if response_parts else "(no response)"
+    Sub-agents share the root's session service so they show up in the UI.
+    Creating every session in one batch keeps this bookkeeping off the
+    sub-agents' run paths; Runner(auto_create_session=True) would instead
+    add a get_session lookup per sub-agent.
+    """
+    invocation_ctx = tool_context._invocation_context
+    session_service = invocation_ctx.session_service
+    session_ids = [
+        f"session_{task['name']}_{os.urandom(4).hex()}" for task in task_prompts
+    ]
+    await asyncio.gather(*(
+        session_service.create_session(
+            app_name=invocation_ctx.app_name,
+            user_id=invocation_ctx.user_id,
+            session_id=session_id,
+        )
+        for session_id in session_ids
+    ))
+    return session_ids
+
+
+def _bounded_sub_agent_runner(
+    tool_context: ToolContext,
+) -> Callable[[dict, Workspace, str], Awaitable[str]]:
+    """Return a coroutine function that runs one task under the concurrency cap."""
+    invocation_ctx = tool_context._invocation_context
+    session_service = invocation_ctx.session_service
+    app_name = invocation_ctx.app_name
+    user_id = invocation_ctx.user_id
+    sem = asyncio.Semaphore(SUBAGENT_MAX_CONCURRENCY)
+
+    async def run_bounded(task: dict, ws: Workspace, session_id: str) -> str:
+        async with sem:
+            return await _run_sub_agent(task["prompt"], ws, session_service,
+                                        app_name, user_id, task["name"],
+                                        session_id)
+    return run_bounded
+
+
+async def _delete_workspaces(workspaces: list[Workspace]) -> None:
+    """Delete workspaces concurrently; one failed delete doesn't abort the others."""
+    await asyncio.gather(
+        *(ws.adelete() for ws in workspaces), return_exceptions=True)
 
 
 async def spawn_sub_agents(
-    task_prompts: list[dict], tool_context: ToolContext
+    task_prompts: list[dict], tool_context: ToolContext, coalesce: bool = True
 ) -> dict:
     """Spawn multiple sub-agents, each running independently in its own ADK environment.
 
@@ -106,37 +214,56 @@ async def spawn_sub_agents(
                       a 'prompt' key for the task description.
         tool_context: Injected by ADK. Used to share the root agent's session
                       service so sub-agent sessions appear in the UI.
+        coalesce: If true, tasks with identical prompts run only once and
+                  share the same response. Set to false when repeated prompts
+                  are meant as independent attempts.
 
     Returns:
         A dictionary with a 'results' key containing a list of dicts, each with
         the original 'prompt', 'name', and the sub-agent's 'response'.
     """
-    invocation_ctx = tool_context._invocation_context
-    session_service = invocation_ctx.session_service
-    app_name = invocation_ctx.app_name
-    user_id = invocation_ctx.user_id
+    if coalesce:
+        unique: dict[str, dict] = {}
+        for task in task_prompts:
+            unique.setdefault(task["prompt"], task)
+        run_tasks = list(unique.values())
+    else:
+        run_tasks = task_prompts
 
-    forked_workspaces = Workspace.fork(
-        workspace, num_of_workspace=len(task_prompts))
-    tasks = [
-        _run_sub_agent(task["prompt"], ws, session_service,
-                       app_name, user_id, task["name"])
-        for task, ws in zip(task_prompts, forked_workspaces)
-    ]
-    responses = await asyncio.gather(*tasks)
+    run_bounded = _bounded_sub_agent_runner(tool_context)
+    forked_workspaces = await Workspace.afork(
+        await _get_workspace(), num_of_workspace=len(run_tasks))
+    try:
+        # Only after the fork succeeded, so a failed fork leaves no empty
+        # sessions behind in the UI.
+        session_ids = await _create_sub_agent_sessions(run_tasks, tool_context)
+        # If one sub-agent fails, the TaskGroup cancels its siblings.
+        async with asyncio.TaskGroup() as tg:
+            tasks = [
+                tg.create_task(run_bounded(task, ws, session_id))
+                for task, ws, session_id in zip(
+                    run_tasks, forked_workspaces, session_ids)
+            ]
+    except* Exception as eg:
+        # Surface the sub-agent's own error instead of the ExceptionGroup.
+        raise eg.exceptions[0]
+    finally:
+        await _delete_workspaces(forked_workspaces)
 
-    for ws in forked_workspaces:
-        ws.delete()
+    if coalesce:
+        by_prompt = {
+            task["prompt"]: t.result() for task, t in zip(run_tasks, tasks)}
+        responses = [by_prompt[task["prompt"]] for task in task_prompts]
+    else:
+        responses = [t.result() for t in tasks]
 
-    results = []
-    for task, response in zip(task_prompts, responses):
-        results.append(
-            {"name": task["name"], "prompt": task["prompt"], "response": response})
+    return {"results": [
+        {"name": task["name"], "prompt": task["prompt"], "response": response}
+        for task, response in zip(task_prompts, responses)
+    ]}
 
-    return {"results": results}
 
-
-def execute_command(command: str) -> dict:
+async def execute_command(command: str) -> dict:
     """Execute a shell command in the workspace.
 
     Args:
@@ -145,28 +272,34 @@ def execute_command(command: str) -> dict:
     Returns:
         A dictionary containing the command execution result.
     """
-    return workspace.exec(command)
-
-
-root_agent = Agent(
-    model="gemini-3-flash-preview",
-    name="manager_agent",
-    description=(
-        "A manager agent that gets workspace context from a GitHub repository "
-        "and coordinates work by spawning sub-agents when useful."
-    ),
-    instruction=(
-        "You are a helpful agent with capability to spawn more sub-agents to do tasks if needed.\n\n"
-        "Always ask the user for a GitHub repository URL first. After receiving "
-        "the URL, clone the repository into the workspace and start by reading "
-        "README.md to understand the project context.\n\n"
-        "Use 'execute_command' for direct workspace operations. If the user's "
-        "request can be split into independent tasks, decompose it into clear, "
-        "self-contained prompts and call 'spawn_sub_agents' with a list of task "
-        "objects, each with a 'name' (a descriptive agent name) and a 'prompt'. "
-        "Each sub-agent runs in its own workspace.\n\n"
-        "After sub-agents finish, review their responses, synthesize the results, "
-        "and provide one unified answer."
-    ),
-    tools=[spawn_sub_agents, execute_command],
-)
+    ws = await _get_workspace()
+    return await ws.aexec(command)
+
+
+def build_manager_agent() -> Agent:
+    """Build the manager agent that coordinates sub-agents over the workspace."""
+    return Agent(
+        model="gemini-3-flash-preview",
+        name="manager_agent",
+        description=(
+            "A manager agent that gets workspace context from a GitHub repository "
+            "and coordinates work by spawning sub-agents when useful."
+        ),
+        instruction=(
+            "You are a helpful agent with capability to spawn more sub-agents to do tasks if needed.\n\n"
+            "Always ask the user for a GitHub repository URL first. After receiving "
+            "the URL, clone the repository into the workspace and start by reading "
+            "README.md to understand the project context.\n\n"
+            "Use 'execute_command' for direct workspace operations. If the user's "
+            "request can be split into independent tasks, decompose it into clear, "
+            "self-contained prompts and call 'spawn_sub_agents' with a list of task "
+            "objects, each with a 'name' (a descriptive agent name) and a 'prompt'. "
+            "Each sub-agent runs in its own workspace.\n\n"
+            "After sub-agents finish, review their responses, synthesize the results, "
+            "and provide one unified answer."
+        ),
+        tools=[spawn_sub_agents, execute_command],
+    )
+
+
+root_agent = build_manager_agent()
@@ -2,112 +2,254 @@
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import math
 import os
+import threading
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 import httpx
+import orjson
 
 BASE_URL = os.environ.get("WORKSPACE_API_URL", "http://localhost:8000")
 DEFAULT_TIMEOUT = 30.0
+EXEC_TIMEOUT = httpx.Timeout(
+    connect=10.0,
+    read=300.0,   # allow long tool executions
+    write=30.0,
+    pool=10.0,
+)
+# Server-side wait requested per snapshot status poll. Servers that don't
+# support long-polling ignore it and answer immediately.
+SNAPSHOT_LONG_POLL_SECONDS = 10
 
 
-def _client() -> httpx.Client:
-    return httpx.Client(base_url=BASE_URL, timeout=DEFAULT_TIMEOUT)
+_CLIENT: httpx.Client | None = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _get_client() -> httpx.Client:
+    """Return the process-wide client, creating it on first use.
+
+    Sharing one client keeps connections alive across API calls instead of
+    paying a fresh TCP/TLS handshake per request.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = httpx.Client(
+                    base_url=BASE_URL,
+                    timeout=DEFAULT_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_keepalive_connections=32, max_connections=64
+                    ),
+                )
+                atexit.register(_CLIENT.close)
+    return _CLIENT
+
+
+# One async client per event loop: its pooled connections are bound to the
+# loop that opened them and fail with "Event loop is closed" on any other.
+_ASYNC_CLIENTS: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, httpx.AsyncClient] = weakref.WeakKeyDictionary()
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Return the async client for the running loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None:
+        client = _ASYNC_CLIENTS[loop] = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_keepalive_connections=32, max_connections=64
+            ),
+        )
+    return client
+
+
+@atexit.register
+def _close_async_clients() -> None:
+    """Close async clients whose loop can still run the shutdown.
+
+    A client can only be closed on its own loop. Once that loop is closed
+    (e.g. after ``asyncio.run`` returns) nothing can close it, and its
+    sockets are released when the interpreter exits.
+    """
+    for loop, client in list(_ASYNC_CLIENTS.items()):
+        if not (loop.is_closed() or loop.is_running()):
+            loop.run_until_complete(client.aclose())
+
+
+def _json(resp: httpx.Response) -> Any:
+    """Raise on HTTP errors, then decode the JSON body with orjson."""
+    resp.raise_for_status()
+    return orjson.loads(resp.content)
 
 
 # ---------- Health / root ----------
 
 def health_check() -> dict:
     """GET /healthz — check API server health."""
-    with _client() as c:
-        resp = c.get("/healthz")
-        resp.raise_for_status()
-        return resp.json()
+    c = _get_client()
+    resp = c.get("/healthz")
+    return _json(resp)
 
 
 def root() -> dict:
     """GET / — root endpoint."""
-    with _client() as c:
-        resp = c.get("/")
-        resp.raise_for_status()
-        return resp.json()
+    c = _get_client()
+    resp = c.get("/")
+    return _json(resp)
 
 
 # ---------- Workspaces ----------
 
 def create_workspace() -> str:
     """POST /workspaces — create a new workspace and return its workspace_id."""
-    with _client() as c:
-        resp = c.post("/workspaces")
-        resp.raise_for_status()
-        return resp.json()["workspace_id"]
+    c = _get_client()
+    resp = c.post("/workspaces")
+    return _json(resp)["workspace_id"]
 
 
 def exec_command(workspace_id: str, command: str) -> dict:
     """POST /exec — execute a command in a workspace."""
-    timeout = httpx.Timeout(
-        connect=10.0,
-        read=300.0,   # allow long tool executions
-        write=30.0,
-        pool=10.0,
-    )
-    with _client() as c:
-        try:
-            resp = c.post(
-                "/execute",
-                json={"workspace_id": workspace_id, "command": command},
-                timeout=timeout,
-            )
-            resp.raise_for_status()
-            return resp.json()
-        except httpx.HTTPStatusError as e:
-            return {
-                "error": True,
-                "status_code": e.response.status_code,
-                "detail": e.response.text,
-            }
+    c = _get_client()
+    try:
+        resp = c.post(
+            "/execute",
+            json={"workspace_id": workspace_id, "command": command},
+            timeout=EXEC_TIMEOUT,
+        )
+        return _json(resp)
+    except httpx.HTTPStatusError as e:
+        return {
+            "error": True,
+            "status_code": e.response.status_code,
+            "detail": e.response.text,
+        }
 
 
 def delete_workspace(workspace_id: str) -> dict:
     """DELETE /workspaces/{workspace_id} — delete a workspace."""
-    with _client() as c:
-        resp = c.delete(f"/workspaces/{workspace_id}")
-        resp.raise_for_status()
-        return resp.json()
+    c = _get_client()
+    resp = c.delete(f"/workspaces/{workspace_id}")
+    return _json(resp)
 
 
 # ---------- Snapshots ----------
 
 def create_snapshot_trigger(workspace_id: str) -> dict:
     """POST /snapshots/triggers — create a snapshot trigger for a workspace."""
-    with _client() as c:
-        resp = c.post("/snapshots/triggers", json={"workspace_id": workspace_id})
-        resp.raise_for_status()
-        return resp.json()
+    c = _get_client()
+    resp = c.post("/snapshots/triggers", json={"workspace_id": workspace_id})
+    return _json(resp)
 
 
 def delete_snapshot_trigger(trigger_name: str) -> dict:
     """DELETE /snapshots/triggers/{trigger_name} — delete a snapshot trigger."""
-    with _client() as c:
-        resp = c.delete(f"/snapshots/triggers/{trigger_name}")
-        resp.raise_for_status()
-        return resp.json()
+    c = _get_client()
+    resp = c.delete(f"/snapshots/triggers/{trigger_name}")
+    return _json(resp)
+
+
+def get_snapshot_status(trigger_name: str, wait_seconds: int = 0) -> dict:
+    """GET /snapshots/status?trigger_name=... — get snapshot status.
+
+    With ``wait_seconds`` the server may hold the request open until the
+    snapshot is ready or that many seconds have passed.
+    """
+    c = _get_client()
+    params: dict[str, Any] = {"trigger_name": trigger_name}
+    if wait_seconds:
+        params["wait_seconds"] = wait_seconds
+    resp = c.get("/snapshots/status", params=params,
+                 timeout=DEFAULT_TIMEOUT + wait_seconds)
+    return _json(resp)
 
 
-def get_snapshot_status(trigger_name: str) -> dict:
-    """GET /snapshots/status?trigger_name=... — get snapshot status."""
-    with _client() as c:
-        resp = c.get("/snapshots/status", params={"trigger_name": trigger_name})
-        resp.raise_for_status()
-        return resp.json()
+def _retry_after(resp: httpx.Response) -> float | None:
+    """Return the Retry-After delay in seconds, if the server sent one."""
+    try:
+        return max(0.0, float(resp.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
 
 
 def restore_from_snapshot(snapshot_name: str) -> dict:
     """POST /snapshots/restore — restore from a named snapshot."""
-    with _client() as c:
-        resp = c.post("/snapshots/restore", json={"snapshot_name": snapshot_name})
-        resp.raise_for_status()
-        return resp.json()
+    c = _get_client()
+    resp = c.post("/snapshots/restore", json={"snapshot_name": snapshot_name})
+    return _json(resp)
+
+
+# ---------- Async variants ----------
+
+async def acreate_workspace() -> str:
+    """Async variant of :func:`create_workspace`."""
+    c = _get_async_client()
+    resp = await c.post("/workspaces")
+    return _json(resp)["workspace_id"]
+
+
+async def aexec_command(workspace_id: str, command: str) -> dict:
+    """Async variant of :func:`exec_command`."""
+    c = _get_async_client()
+    try:
+        resp = await c.post(
+            "/execute",
+            json={"workspace_id": workspace_id, "command": command},
+            timeout=EXEC_TIMEOUT,
+        )
+        return _json(resp)
+    except httpx.HTTPStatusError as e:
+        return {
+            "error": True,
+            "status_code": e.response.status_code,
+            "detail": e.response.text,
+        }
+
+
+async def adelete_workspace(workspace_id: str) -> dict:
+    """Async variant of :func:`delete_workspace`."""
+    c = _get_async_client()
+    resp = await c.delete(f"/workspaces/{workspace_id}")
+    return _json(resp)
+
+
+async def acreate_snapshot_trigger(workspace_id: str) -> dict:
+    """Async variant of :func:`create_snapshot_trigger`."""
+    c = _get_async_client()
+    resp = await c.post(
+        "/snapshots/triggers", json={"workspace_id": workspace_id})
+    return _json(resp)
+
+
+async def aget_snapshot_status(
+    trigger_name: str, wait_seconds: int = 0
+) -> dict:
+    """Async variant of :func:`get_snapshot_status`."""
+    c = _get_async_client()
+    params: dict[str, Any] = {"trigger_name": trigger_name}
+    if wait_seconds:
+        params["wait_seconds"] = wait_seconds
+    resp = await c.get("/snapshots/status", params=params,
+                       timeout=DEFAULT_TIMEOUT + wait_seconds)
+    return _json(resp)
+
+
+async def arestore_from_snapshot(snapshot_name: str) -> dict:
+    """Async variant of :func:`restore_from_snapshot`."""
+    c = _get_async_client()
+    resp = await c.post(
+        "/snapshots/restore", json={"snapshot_name": snapshot_name})
+    return _json(resp)
 
 
 # ---------- Workspace class ----------
@@ -124,6 +266,10 @@ class Workspace:
 
     def __init__(self, workspace_id: str) -> None:
         self.workspace_id = workspace_id
+        self._mtime = 0
+        # (snapshot_name, mutation counter when it was taken), kept on the
+        # instance so it can never disagree with this instance's counter.
+        self._snapshot: tuple[str, int] | None = None
 
     @classmethod
     def create(cls) -> Workspace:
@@ -131,18 +277,51 @@ class Workspace:
         workspace_id = create_workspace()
         return cls(workspace_id)
 
+    @classmethod
+    async def acreate(cls) -> Workspace:
+        """Async variant of :meth:`create`."""
+        workspace_id = await acreate_workspace()
+        return cls(workspace_id)
+
     def exec(self, command: str) -> dict:
         """Execute a command in this workspace."""
-        return exec_command(self.workspace_id, command)
+        # Bump on both sides so a snapshot taken while the command runs is
+        # never cached as current.
+        self._mtime += 1
+        try:
+            return exec_command(self.workspace_id, command)
+        finally:
+            self._mtime += 1
+
+    async def aexec(self, command: str) -> dict:
+        """Async variant of :meth:`exec`."""
+        self._mtime += 1
+        try:
+            return await aexec_command(self.workspace_id, command)
+        finally:
+            self._mtime += 1
 
     def delete(self) -> dict:
         """Delete this workspace."""
         return delete_workspace(self.workspace_id)
 
+    async def adelete(self) -> dict:
+        """Async variant of :meth:`delete`."""
+        return await adelete_workspace(self.workspace_id)
+
     def create_snapshot_trigger(self) -> dict:
         """Create a snapshot trigger for this workspace."""
         return create_snapshot_trigger(self.workspace_id)
 
+    def _cached_snapshot(self) -> str | None:
+        """Return the last snapshot name if the workspace is unchanged since."""
+        if self._snapshot is not None and self._snapshot[1] == self._mtime:
+            return self._snapshot[0]
+        return None
+
+    def _cache_snapshot(self, snapshot_name: str, mtime: int) -> None:
+        self._snapshot = (snapshot_name, mtime)
+
     @classmethod
     def fork(
         cls,
@@ -153,6 +332,12 @@ class Workspace:
     ) -> list[Workspace]:
         """Fork a workspace by snapshotting it and restoring into new ones.
 
+        The snapshot is reused across calls until ``source`` runs another
+        command, so repeated forks of an unchanged workspace skip the
+        snapshot wait. Readiness is long-polled; against servers that answer
+        immediately, polling backs off from 50ms up to 1s and honors
+        Retry-After.
+
         Args:
             source: The workspace to fork from.
             num_of_workspace: Number of new workspaces to create from the snapshot.
@@ -164,29 +349,136 @@ class Workspace:
         Raises:
             TimeoutError: If the snapshot is not ready within the timeout.
         """
+        snapshot_name = source._cached_snapshot()
+        if snapshot_name is None:
+            snapshot_name = cls._take_snapshot(source, timeout)
+        if num_of_workspace < 1:
+            return []
+        # Restores are independent, so issue them concurrently.
+        with ThreadPoolExecutor(max_workers=num_of_workspace) as pool:
+            futures = [
+                pool.submit(restore_from_snapshot, snapshot_name)
+                for _ in range(num_of_workspace)
+            ]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            # The snapshot may be gone server-side; retake it next time.
+            source._snapshot = None
+            # Don't leak the workspaces whose restore did succeed.
+            for f in futures:
+                if f.exception() is None:
+                    try:
+                        delete_workspace(f.result()["workspace_id"])
+                    except httpx.HTTPError:
+                        pass
+            raise errors[0]
+        return [cls(f.result()["workspace_id"]) for f in futures]
+
+    @classmethod
+    def _take_snapshot(cls, source: Workspace, timeout: float) -> str:
+        """Snapshot ``source``, wait until it is ready and return its name."""
+        mtime = source._mtime
         trigger = source.create_snapshot_trigger()
         trigger_name = trigger["name"]
 
         deadline = time.monotonic() + timeout
+        delay = 0.05
+        while True:
+            # Whole seconds: servers may type the parameter as an int.
+            wait = min(SNAPSHOT_LONG_POLL_SECONDS,
+                       math.ceil(max(0.0, deadline - time.monotonic())))
+            try:
+                status = get_snapshot_status(trigger_name, wait)
+                retry_after = None
+            except httpx.HTTPStatusError as e:
+                # Busy servers (429/503) say when to come back.
+                status, retry_after = {}, _retry_after(e.response)
+            if status.get("ready"):
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"Snapshot {trigger_name!r} not ready after {timeout}s"
+                )
+            # Back off in case the server answered without long-polling.
+            time.sleep(min(retry_after if retry_after is not None else delay,
+                           remaining))
+            delay = min(delay * 1.5, 1.0)
+
+        snapshot_name = status["snapshot_name"]
+        source._cache_snapshot(snapshot_name, mtime)
+        return snapshot_name
+
+    @classmethod
+    async def afork(
+        cls,
+        source: Workspace,
+        *,
+        num_of_workspace: int = 1,
+        timeout: float = 60.0,
+    ) -> list[Workspace]:
+        """Async variant of :meth:`fork`.
+
+        Waits for snapshot readiness without blocking the event loop.
+        """
+        snapshot_name = source._cached_snapshot()
+        if snapshot_name is None:
+            snapshot_name = await cls._atake_snapshot(source, timeout)
+        # gather (not a TaskGroup) so every restore settles: a cancelled
+        # restore may still create a workspace whose id we never learn.
+        results = await asyncio.gather(
+            *(arestore_from_snapshot(snapshot_name)
+              for _ in range(num_of_workspace)),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            # The snapshot may be gone server-side; retake it next time.
+            source._snapshot = None
+            # Don't leak the workspaces whose restore did succeed.
+            await asyncio.gather(
+                *(adelete_workspace(r["workspace_id"])
+                  for r in results if not isinstance(r, BaseException)),
+                return_exceptions=True,
+            )
+            raise errors[0]
+        return [cls(result["workspace_id"]) for result in results]
+
+    @classmethod
+    async def _atake_snapshot(cls, source: Workspace, timeout: float) -> str:
+        """Async variant of :meth:`_take_snapshot`."""
+        mtime = source._mtime
+        trigger = await acreate_snapshot_trigger(source.workspace_id)
+        trigger_name = trigger["name"]
+
+        deadline = time.monotonic() + timeout
+        delay = 0.05
         while True:
+            # Whole seconds: servers may type the parameter as an int.
+            wait = min(SNAPSHOT_LONG_POLL_SECONDS,
+                       math.ceil(max(0.0, deadline - time.monotonic())))
             try:
-                status = get_snapshot_status(trigger_name)
-            except httpx.HTTPStatusError:
-                status = {}
+                status = await aget_snapshot_status(trigger_name, wait)
+                retry_after = None
+            except httpx.HTTPStatusError as e:
+                # Busy servers (429/503) say when to come back.
+                status, retry_after = {}, _retry_after(e.response)
             if status.get("ready"):
                 break
-            if time.monotonic() >= deadline:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 raise TimeoutError(
                     f"Snapshot {trigger_name!r} not ready after {timeout}s"
                 )
-            time.sleep(1)
+            # Back off in case the server answered without long-polling.
+            await asyncio.sleep(
+                min(retry_after if retry_after is not None else delay,
+                    remaining))
+            delay = min(delay * 1.5, 1.0)
 
         snapshot_name = status["snapshot_name"]
-        workspaces = []
-        for _ in range(num_of_workspace):
-            result = restore_from_snapshot(snapshot_name)
-            workspaces.append(cls(result["workspace_id"]))
-        return workspaces
+        source._cache_snapshot(snapshot_name, mtime)
+        return snapshot_name
 
     def __repr__(self) -> str:
         return f"Workspace({self.workspace_id!r})"